@@ -10,6 +10,7 @@
  */
 
 import { ImageUpscaler } from '../../ml/ImageUpscaler.js';
+import { canvasToBlob } from '../../utils/canvas.js';
 
 export class UpscaleModule {
     constructor(editor) {
@@ -160,9 +161,13 @@ export class UpscaleModule {
                 }
             );
 
-            // Create image from canvas
+            // Create image from canvas via a Blob URL (avoids synchronous PNG + base64 encoding)
+            const blob = await canvasToBlob(upscaledCanvas, 'image/png');
+
             const img = new Image();
             img.onload = () => {
+                URL.revokeObjectURL(img.src);
+
                 // Update state
                 this.state.setImage(img);
 
@@ -187,7 +192,14 @@ export class UpscaleModule {
                 this.updateDimensions();
 
             };
-            img.src = upscaledCanvas.toDataURL('image/png');
+            img.onerror = (error) => {
+                URL.revokeObjectURL(img.src);
+                console.error('Upscale failed: could not decode result', error);
+                if (progressSection) progressSection.style.display = 'none';
+                if (btnApply) btnApply.disabled = false;
+                if (progressBar) progressBar.style.width = '0%';
+            };
+            img.src = URL.createObjectURL(blob);
 
         } catch (error) {
             console.error('Upscale failed:', error);
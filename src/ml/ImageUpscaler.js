@@ -8,9 +8,12 @@
  * Falls back to local browser AI if server unavailable
  */
 
+import { canvasToBlob } from '../utils/canvas.js';
+
 export class ImageUpscaler {
     constructor() {
         this.upscaler = null;
+        this.upscalerScale = null;
         this.isLoading = false;
         this.isProcessing = false;
 
@@ -112,13 +115,16 @@ export class ImageUpscaler {
     async _processWithServer(source, srcWidth, srcHeight, outWidth, outHeight, progressCallback) {
         progressCallback(5, 'Connecting to AI server...');
 
-        // Convert source to base64
-        const canvas = document.createElement('canvas');
-        canvas.width = srcWidth;
-        canvas.height = srcHeight;
-        const ctx = canvas.getContext('2d');
-        ctx.drawImage(source, 0, 0);
-        const base64 = canvas.toDataURL('image/png');
+        // Convert source to base64 (canvases are encoded as-is, without an extra copy)
+        let canvas = source;
+        if (!(source instanceof HTMLCanvasElement)) {
+            canvas = document.createElement('canvas');
+            canvas.width = srcWidth;
+            canvas.height = srcHeight;
+            const ctx = canvas.getContext('2d');
+            ctx.drawImage(source, 0, 0);
+        }
+        const base64 = await this._canvasToDataURL(canvas);
 
         progressCallback(15, 'Sending to AI server...');
 
@@ -153,20 +159,17 @@ export class ImageUpscaler {
             const result = await response.json();
 
             // Convert result to canvas
-            const img = new Image();
-            await new Promise((resolve, reject) => {
-                img.onload = resolve;
-                img.onerror = reject;
-                img.src = result.image;
-            });
+            const img = await this._decodeDataURL(result.image);
 
             progressCallback(90, 'Finalizing...');
 
             const outputCanvas = document.createElement('canvas');
             outputCanvas.width = img.width;
             outputCanvas.height = img.height;
-            const outputCtx = outputCanvas.getContext('2d');
+            // Keep the canvas CPU-backed when sharpening reads it back (no GPU upload + readback)
+            const outputCtx = outputCanvas.getContext('2d', { willReadFrequently: this.sharpenEdges });
             outputCtx.drawImage(img, 0, 0);
+            img.close?.();
 
             // Apply additional sharpening if enabled
             if (this.sharpenEdges) {
@@ -191,25 +194,32 @@ export class ImageUpscaler {
         progressCallback(10, 'Loading local AI model...');
 
         try {
-            const { default: Upscaler } = await import('upscaler');
-
-            let model;
             const scale = this.processingMode === 'enhance' ? 2 : this.scaleFactor;
+            const modelScale = scale <= 2 ? 2 : scale <= 3 ? 3 : 4;
+
+            // Reuse the loaded model; only rebuild when a different scale is needed
+            if (!this.upscaler || this.upscalerScale !== modelScale) {
+                let modelImport;
+                if (modelScale === 2) {
+                    modelImport = import('@upscalerjs/esrgan-thick/2x');
+                } else if (modelScale === 3) {
+                    modelImport = import('@upscalerjs/esrgan-thick/3x');
+                } else {
+                    modelImport = import('@upscalerjs/esrgan-thick/4x');
+                }
 
-            if (scale <= 2) {
-                const { default: m } = await import('@upscalerjs/esrgan-thick/2x');
-                model = m;
-            } else if (scale <= 3) {
-                const { default: m } = await import('@upscalerjs/esrgan-thick/3x');
-                model = m;
-            } else {
-                const { default: m } = await import('@upscalerjs/esrgan-thick/4x');
-                model = m;
-            }
+                // Fetch the library and model chunks in parallel
+                const [{ default: Upscaler }, { default: model }] = await Promise.all([
+                    import('upscaler'),
+                    modelImport,
+                ]);
 
-            progressCallback(30, 'Initializing local AI...');
+                progressCallback(30, 'Initializing local AI...');
 
-            this.upscaler = new Upscaler({ model });
+                this.dispose();
+                this.upscaler = new Upscaler({ model });
+                this.upscalerScale = modelScale;
+            }
 
             progressCallback(40, 'Processing...');
 
@@ -224,12 +234,7 @@ export class ImageUpscaler {
 
             progressCallback(85, 'Finalizing...');
 
-            const img = new Image();
-            await new Promise((resolve, reject) => {
-                img.onload = resolve;
-                img.onerror = reject;
-                img.src = enhancedDataUrl;
-            });
+            const img = await this._decodeDataURL(enhancedDataUrl);
 
             // Scale to target size
             const targetWidth = this.processingMode === 'enhance' ? srcWidth : outWidth;
@@ -238,10 +243,11 @@ export class ImageUpscaler {
             const canvas = document.createElement('canvas');
             canvas.width = targetWidth;
             canvas.height = targetHeight;
-            const ctx = canvas.getContext('2d');
+            const ctx = canvas.getContext('2d', { willReadFrequently: this.sharpenEdges });
             ctx.imageSmoothingEnabled = true;
             ctx.imageSmoothingQuality = 'high';
             ctx.drawImage(img, 0, 0, targetWidth, targetHeight);
+            img.close?.();
 
             if (this.sharpenEdges) {
                 progressCallback(92, 'Sharpening...');
@@ -266,7 +272,7 @@ export class ImageUpscaler {
         const canvas = document.createElement('canvas');
         canvas.width = outWidth;
         canvas.height = outHeight;
-        const ctx = canvas.getContext('2d');
+        const ctx = canvas.getContext('2d', { willReadFrequently: this.sharpenEdges });
         ctx.imageSmoothingEnabled = true;
         ctx.imageSmoothingQuality = 'high';
         ctx.drawImage(source, 0, 0, srcWidth, srcHeight, 0, 0, outWidth, outHeight);
@@ -280,6 +286,40 @@ export class ImageUpscaler {
         return canvas;
     }
 
+    /**
+     * Encode a canvas as a PNG data URL without blocking the main thread.
+     * toBlob encodes asynchronously; FileReader then produces the base64 payload.
+     */
+    async _canvasToDataURL(canvas) {
+        const blob = await canvasToBlob(canvas, 'image/png');
+
+        return await new Promise((resolve, reject) => {
+            const reader = new FileReader();
+            reader.onload = () => resolve(reader.result);
+            reader.onerror = () => reject(reader.error);
+            reader.readAsDataURL(blob);
+        });
+    }
+
+    /**
+     * Decode a data URL into a drawable image.
+     * Prefers createImageBitmap, which decodes off the main thread without an <img> element.
+     */
+    async _decodeDataURL(dataUrl) {
+        if (typeof createImageBitmap !== 'undefined') {
+            const blob = await (await fetch(dataUrl)).blob();
+            return await createImageBitmap(blob);
+        }
+
+        const img = new Image();
+        await new Promise((resolve, reject) => {
+            img.onload = resolve;
+            img.onerror = reject;
+            img.src = dataUrl;
+        });
+        return img;
+    }
+
     /**
      * Detail enhancement (unsharp mask)
      */
@@ -291,24 +331,25 @@ export class ImageUpscaler {
         const amount = 0.3;
         const threshold = 8;
 
-        for (let i = 0; i < data.length; i += 4) {
-            const x = (i / 4) % width;
-            const y = Math.floor((i / 4) / width);
-
-            if (x <= 1 || x >= width - 2 || y <= 1 || y >= height - 2) continue;
-
-            for (let c = 0; c < 3; c++) {
-                const idx = i + c;
-                const current = original[idx];
-                const top = original[idx - width * 4];
-                const bottom = original[idx + width * 4];
-                const left = original[idx - 4];
-                const right = original[idx + 4];
-                const avgNeighbor = (top + bottom + left + right) / 4;
-                const diff = current - avgNeighbor;
-
-                if (Math.abs(diff) > threshold) {
-                    data[idx] = Math.min(255, Math.max(0, Math.round(current + diff * amount)));
+        // Walk interior pixels row by row (2px border untouched) to avoid per-pixel index math
+        const stride = width * 4;
+        for (let y = 2; y < height - 2; y++) {
+            const rowEnd = y * stride + (width - 2) * 4;
+            for (let i = y * stride + 8; i < rowEnd; i += 4) {
+                for (let c = 0; c < 3; c++) {
+                    const idx = i + c;
+                    const current = original[idx];
+                    const top = original[idx - stride];
+                    const bottom = original[idx + stride];
+                    const left = original[idx - 4];
+                    const right = original[idx + 4];
+                    const avgNeighbor = (top + bottom + left + right) / 4;
+                    const diff = current - avgNeighbor;
+
+                    // Uint8ClampedArray clamps to [0, 255] on write
+                    if (Math.abs(diff) > threshold) {
+                        data[idx] = Math.round(current + diff * amount);
+                    }
                 }
             }
         }
@@ -322,22 +363,26 @@ export class ImageUpscaler {
     async upscaleFromWebGL(gl, width, height, progressCallback = () => { }) {
         progressCallback(0, 'Reading image...');
 
-        const pixels = new Uint8Array(width * height * 4);
-        gl.readPixels(0, 0, width, height, gl.RGBA, gl.UNSIGNED_BYTE, pixels);
-
         const tempCanvas = document.createElement('canvas');
         tempCanvas.width = width;
         tempCanvas.height = height;
-        const tempCtx = tempCanvas.getContext('2d');
+        // CPU-backed: pixels are written from the CPU and read back by the encoder/model
+        const tempCtx = tempCanvas.getContext('2d', { willReadFrequently: true });
         const imageData = tempCtx.createImageData(width, height);
 
-        // Flip Y axis (WebGL origin is bottom-left)
-        for (let y = 0; y < height; y++) {
-            const srcRow = (height - 1 - y) * width * 4;
-            const dstRow = y * width * 4;
-            for (let x = 0; x < width * 4; x++) {
-                imageData.data[dstRow + x] = pixels[srcRow + x];
-            }
+        // Read straight into the ImageData buffer (no intermediate pixel copy)
+        const pixels = new Uint8Array(imageData.data.buffer);
+        gl.readPixels(0, 0, width, height, gl.RGBA, gl.UNSIGNED_BYTE, pixels);
+
+        // Flip Y axis in place (WebGL origin is bottom-left)
+        const rowBytes = width * 4;
+        const rowTemp = new Uint8Array(rowBytes);
+        for (let top = 0, bottom = height - 1; top < bottom; top++, bottom--) {
+            const topRow = pixels.subarray(top * rowBytes, (top + 1) * rowBytes);
+            const bottomRow = pixels.subarray(bottom * rowBytes, (bottom + 1) * rowBytes);
+            rowTemp.set(topRow);
+            topRow.set(bottomRow);
+            bottomRow.set(rowTemp);
         }
 
         tempCtx.putImageData(imageData, 0, 0);
@@ -356,6 +401,7 @@ export class ImageUpscaler {
         if (this.upscaler) {
             this.upscaler.dispose();
             this.upscaler = null;
+            this.upscalerScale = null;
         }
     }
 }
@@ -0,0 +1,19 @@
+/**
+ * Canvas helpers
+ */
+
+/**
+ * Encode a canvas to a Blob asynchronously (non-blocking alternative to toDataURL)
+ */
+export function canvasToBlob(canvas, type = 'image/png', quality) {
+    return new Promise((resolve, reject) => {
+        canvas.toBlob(
+            (blob) => {
+                if (blob) resolve(blob);
+                else reject(new Error('Failed to create blob from canvas'));
+            },
+            type,
+            quality
+        );
+    });
+}
@@ -4,3 +4,4 @@
  */
 
 export { inject as injectAnalytics } from './analytics.js';
+export { canvasToBlob } from './canvas.js';